@@ -13,9 +13,13 @@ https://opensource.org/licenses/BSD-3-Clause
 
 import os
 from os.path import join
+import shutil
+import tempfile
+import time
 
 import numpy as np
 import scipy.stats as sps
+from scipy import sparse, special
 import pandas as pd
 
 
@@ -77,10 +81,9 @@ def SDT(hits, misses, fas, crs):
     return out
 
 
-def process_sub_behav_data(sub_id, main_dir=None, behav_data=None):
+def import_enc_data(sub_id, main_dir=None):
     """
-    Calculate accuracy and reaction time for the encoding task for sub_id 
-    and add to dataframe in mem_data
+    Import encoding task data for sub_id (non-practice trials only)
     """
     
     if main_dir is None:
@@ -88,8 +91,6 @@ def process_sub_behav_data(sub_id, main_dir=None, behav_data=None):
     
     behav_dir = join(main_dir, 'psychopy')
     
-    ############## IMPORT ENCODING DATA ##############
-    
     #Find encoding psychopy file
     enc_file = [file for file in os.listdir(behav_dir) if 
     			file.startswith('%s_enc' % sub_id) and
@@ -108,14 +109,28 @@ def process_sub_behav_data(sub_id, main_dir=None, behav_data=None):
     if enc_data['list'][0] != float(sub_id[:2]):
         print("WARNING: List number doesn't match subject ID for encoding/n")
     
-    ############## CALCULATE ACC AND RT ##############
-    
     #Get just non-practice trial rows
-    enc_data = enc_data[enc_data['block_loop_thisRepN'] == 1]
+    enc_data = enc_data[enc_data['block_loop_thisRepN'] == 1].copy()
 
     #Adjust reaction time for delay in gamepad component starting
     enc_data['gamepad_resp_rt'] += 0.05
+    
+    return enc_data
 
+
+def process_sub_behav_data(sub_id, main_dir=None, behav_data=None, enc_rts=None):
+    """
+    Calculate accuracy and reaction time for the encoding task for sub_id 
+    and add to dataframe in mem_data. If a dictionary is given for enc_rts, 
+    RTs for each condition are added to it for ex-Gaussian fitting.
+    """
+    
+    ############## IMPORT ENCODING DATA ##############
+    
+    enc_data = import_enc_data(sub_id, main_dir)
+    
+    ############## CALCULATE ACC AND RT ##############
+    
     #Initalize data frame
     if behav_data is None:
         behav_data = pd.DataFrame()
@@ -154,6 +169,158 @@ def process_sub_behav_data(sub_id, main_dir=None, behav_data=None):
         behav_data.loc[sub_id, cond+'_tmeanRT'] = sps.trim_mean(enc_data.loc[enc_data['valence'] == cond, 
                                                                             'gamepad_resp_rt'], 0.2) * 1000
     
+    #Save RTs (in seconds) for ex-Gaussian fitting
+    if enc_rts is not None:
+        enc_rts[sub_id] = {cond: enc_data.loc[enc_data['valence'] == cond, 'gamepad_resp_rt'].values
+                           for cond in ['NEU', 'NEG', 'animal']}
+    
+    return behav_data
+
+
+def _exgauss_nll(params, X, W):
+    """
+    Negative log-likelihood of the ex-Gaussian distribution and its gradient
+    for each cell. params is a cells x 3 array of mu, log(sigma), and log(tau);
+    X is a cells x trials array of RTs padded to the same length and W is a 
+    cells x trials array of 1s (real trials) and 0s (padding).
+    """
+
+    (mu, log_sigma, log_tau) = (params[:, [i]] for i in range(3))
+    sigma = np.exp(log_sigma)
+    tau = np.exp(log_tau)
+
+    #log f(x) = -log(tau) + (mu-x)/tau + sigma^2/(2*tau^2) + log(Phi(z))
+    z = (X - mu)/sigma - sigma/tau
+    log_Phi = special.log_ndtr(z)
+    log_f = -log_tau + (mu - X)/tau + sigma**2/(2*tau**2) + log_Phi
+
+    #Derivatives with respect to mu, log(sigma), and log(tau)
+    h = np.exp(-z**2/2 - 0.5*np.log(2*np.pi) - log_Phi) #phi(z)/Phi(z)
+    d_mu = 1/tau - h/sigma
+    d_log_sigma = sigma**2/tau**2 - h*((X - mu)/sigma + sigma/tau)
+    d_log_tau = -1 + (X - mu)/tau - sigma**2/tau**2 + h*sigma/tau
+
+    nll = -np.sum(W * log_f, axis=1)
+    grad = -np.column_stack([np.sum(W * d, axis=1) for d in (d_mu, d_log_sigma, d_log_tau)])
+
+    return (nll, grad)
+
+
+def fit_exgauss(rts, min_trials=20, max_iter=200, tol=1e-8):
+    """
+    Fit the ex-Gaussian distribution to several sets of RTs at once by
+    maximum likelihood. All cells are optimized together: each iteration 
+    takes a Levenberg-Marquardt step for every cell using a vectorized 
+    likelihood, so the whole cohort is fit in a single loop.
+
+    Starting values are from the method of moments heuristic tau = 0.8*SD,
+    mu = M - tau, sigma = 0.6*SD, so fits are deterministic.
+
+    Returns a cells x 3 array of mu, sigma, and tau (in the units of the RTs).
+    Cells with fewer than min_trials RTs are NaN.
+    """
+
+    rts = [np.asarray(x, dtype=float) for x in rts]
+    rts = [x[~np.isnan(x)] for x in rts]
+    use = np.array([len(x) >= min_trials for x in rts])
+    out = np.full((len(rts), 3), np.nan)
+    if not use.any():
+        return out
+    rts = [x for (x, u) in zip(rts, use) if u]
+    n_cells = len(rts)
+
+    #Pad RTs to a cells x trials array
+    max_n = max(len(x) for x in rts)
+    X = np.zeros((n_cells, max_n))
+    W = np.zeros((n_cells, max_n))
+    for (i, x) in enumerate(rts):
+        X[i, :len(x)] = x
+        X[i, len(x):] = x.mean()
+        W[i, :len(x)] = 1
+
+    #Starting values and scale of parameters
+    M = np.array([x.mean() for x in rts])
+    SD = np.array([x.std(ddof=1) for x in rts])
+    params = np.column_stack((M - 0.8*SD, np.log(0.6*SD), np.log(0.8*SD)))
+
+    step_scale = np.column_stack((SD, np.ones(n_cells), np.ones(n_cells)))
+    log_lower = np.log(SD * 1e-3)[:, np.newaxis]
+    log_upper = np.log(SD * 10)[:, np.newaxis]
+
+    (nll, grad) = _exgauss_nll(params, X, W)
+    lam = np.full(n_cells, 1e-3)
+    active = np.ones(n_cells, dtype=bool)
+    eps = 1e-6
+    for _ in range(max_iter):
+
+        #Hessian by finite differences of the analytic gradient
+        H = np.empty((n_cells, 3, 3))
+        for k in range(3):
+            step = np.zeros(3)
+            step[k] = eps
+            H[:, :, k] = (_exgauss_nll(params + step, X, W)[1] - grad) / eps
+        H = (H + H.transpose(0, 2, 1)) / 2
+
+        #Damped Newton step for each cell
+        A = H + lam[:, np.newaxis, np.newaxis] * np.abs(H).max(axis=(1, 2))[:, np.newaxis, np.newaxis] * np.eye(3)
+        try:
+            delta = -np.linalg.solve(A, grad[:, :, np.newaxis])[:, :, 0]
+        except np.linalg.LinAlgError:
+            delta = -grad * 1e-3
+        delta[~active] = 0
+        delta[~np.isfinite(delta)] = 0
+
+        #Limit step size and keep sigma and tau within a plausible range
+        delta *= np.minimum(1, 1 / np.abs(delta / step_scale).max(axis=1, initial=1e-12))[:, np.newaxis]
+        new_params = params + delta
+        new_params[:, 1:] = np.clip(new_params[:, 1:], log_lower, log_upper)
+
+        #Accept steps that improve the fit and adjust damping
+        (new_nll, new_grad) = _exgauss_nll(new_params, X, W)
+        better = np.isfinite(new_nll) & (new_nll <= nll)
+        improvement = np.where(better, nll - new_nll, 0)
+        params[better] = new_params[better]
+        nll[better] = new_nll[better]
+        grad[better] = new_grad[better]
+        lam = np.where(better, np.maximum(lam / 10, 1e-12), lam * 10)
+
+        #Cells are done when the fit no longer improves
+        active &= ~((better & (improvement < tol * (1 + np.abs(nll)))) | (lam > 1e10))
+        if not active.any():
+            break
+    else:
+        print('WARNING: ex-Gaussian fit did not converge for %d cells' % active.sum())
+
+    out[use, :] = np.column_stack((params[:, 0], np.exp(params[:, 1]), np.exp(params[:, 2])))
+
+    return out
+
+
+def process_exgauss(enc_rts, behav_data=None):
+    """
+    Fit ex-Gaussian parameters to encoding RTs for each subject x valence
+    condition and add to dataframe in behav_data. enc_rts is a dictionary
+    of RTs for each subject and condition from process_sub_behav_data.
+    """
+
+    if behav_data is None:
+        behav_data = pd.DataFrame()
+
+    #Get RTs (in seconds) for each cell
+    cells = []
+    rts = []
+    for sub_id in enc_rts:
+        for cond in enc_rts[sub_id]:
+            cells.append((sub_id, cond))
+            rts.append(enc_rts[sub_id][cond])
+
+    params = fit_exgauss(rts)
+
+    for ((sub_id, cond), (mu, sigma, tau)) in zip(cells, params):
+        behav_data.loc[sub_id, cond+'_exG_mu'] = mu * 1000
+        behav_data.loc[sub_id, cond+'_exG_sigma'] = sigma * 1000
+        behav_data.loc[sub_id, cond+'_exG_tau'] = tau * 1000
+
     return behav_data
 
 
@@ -202,9 +369,9 @@ def process_sub_mem_data(sub_id, mem_data=None, main_dir=None):
         #Make R/K response column numeric
         ret2_data['rk_resp_keys'] = ret2_data['rk_resp_keys'].replace({'None':np.nan}).astype(float)
     
-    #Check list number
-    if ret2_data['list'][0] != float(sub_id[:2]):
-        print("WARNING: List number doesn't match subject ID for delayed retrieval/n")
+        #Check list number
+        if ret2_data['list'][0] != float(sub_id[:2]):
+            print("WARNING: List number doesn't match subject ID for delayed retrieval/n")
         
     
     ############## CALCULATE MEMORY STATS ##############
@@ -322,9 +489,36 @@ def process_sub_mem_data(sub_id, mem_data=None, main_dir=None):
     return mem_data
 
 
-def process_sub(sub_id, main_dir=None, behav_data=None, mem_data=None, save_files=True):
+def atomic_to_csv(df, file, **kwargs):
     """
-    Run encoding and behavioral statistis for a subject and add to summary files
+    Write a data frame to csv via a temporary file in the same directory that
+    then replaces file, so that readers never see a partially written file
+    """
+    
+    (fd, tmp_file) = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(file))
+    try:
+        with os.fdopen(fd, 'w', newline='') as f:
+            df.to_csv(f, **kwargs)
+        #mkstemp creates owner-only files, so use the permissions of the 
+        #existing file or the default for a new file
+        if os.path.exists(file):
+            shutil.copymode(file, tmp_file)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp_file, 0o666 & ~umask)
+        os.replace(tmp_file, file)
+    except BaseException:
+        os.remove(tmp_file)
+        raise
+
+
+def process_sub(sub_id, main_dir=None, behav_data=None, mem_data=None, save_files=True,
+                exgauss=True, enc_rts=None):
+    """
+    Run encoding and behavioral statistis for a subject and add to summary files.
+    Set exgauss=False to skip ex-Gaussian RT fitting and pass a dictionary for
+    enc_rts to collect RTs to fit all subjects together later.
     """
     
     #Encoding
@@ -334,9 +528,14 @@ def process_sub(sub_id, main_dir=None, behav_data=None, mem_data=None, save_file
             behav_data = pd.read_csv(behav_summary, index_col='sub_id')
         else:
             behav_data = None
-    behav_data = process_sub_behav_data(sub_id, behav_data=behav_data, main_dir=main_dir)
+    if enc_rts is None:
+        enc_rts = {}
+    behav_data = process_sub_behav_data(sub_id, behav_data=behav_data, main_dir=main_dir,
+                                        enc_rts=enc_rts)
+    if exgauss:
+        behav_data = process_exgauss({sub_id: enc_rts[sub_id]}, behav_data=behav_data)
     if save_files:
-        behav_data.to_csv(behav_summary, index_label='sub_id')
+        atomic_to_csv(behav_data, behav_summary, index_label='sub_id')
     
     #Retrieval
     mem_summary = join(main_dir, 'stats', 'behavioral', 'EmCon_memory_wide.csv')
@@ -347,7 +546,7 @@ def process_sub(sub_id, main_dir=None, behav_data=None, mem_data=None, save_file
             mem_data = None
     mem_data = process_sub_mem_data(sub_id, mem_data=mem_data, main_dir=main_dir)
     if save_files:
-        mem_data.to_csv(mem_summary, index_label='sub_id')
+        atomic_to_csv(mem_data, mem_summary, index_label='sub_id')
     
     return (behav_data, mem_data)
 
@@ -371,20 +570,25 @@ def process_all(main_dir=None):
     #Start from scratch
     behav_data = None
     mem_data = None
+    enc_rts = {}
     
     #Proces all subjects
     for sub_id in sub_ids:
-        
-        #We don't need to resave the file everytime
-        if sub_id == sub_ids[-1]:
-            save_files = True
-        else:
-            save_files = False
-        
-        #Process data for subject
         (behav_data, mem_data) = process_sub(sub_id, main_dir=main_dir, 
                                              behav_data=behav_data, mem_data=mem_data, 
-                                             save_files=save_files)
+                                             save_files=False, exgauss=False, enc_rts=enc_rts)
+    
+    if not sub_ids:
+        return (behav_data, mem_data)
+    
+    #Fit ex-Gaussian RT distributions for all subjects at once
+    behav_data = process_exgauss(enc_rts, behav_data=behav_data)
+    
+    #Save summary files
+    atomic_to_csv(behav_data, join(main_dir, 'stats', 'behavioral', 'EmCon_EncBehav_wide.csv'),
+                  index_label='sub_id')
+    atomic_to_csv(mem_data, join(main_dir, 'stats', 'behavioral', 'EmCon_memory_wide.csv'),
+                  index_label='sub_id')
         
     return (behav_data, mem_data)
 
@@ -409,21 +613,349 @@ def wide2long(mem_data):
     return wdata
 
 
-def main():
+#Integer codes for item-level memory outcomes (0 = untested/no response)
+ITEM_CODES = {'Old_miss': 1, 'Old_K': 2, 'Old_R': 3,
+              'New_CR': 4, 'New_K': 5, 'New_R': 6}
+
+
+def SDT_array(hits, misses, fas, crs):
+    """
+    Vectorized version of SDT for arrays of counts (e.g., one element per
+    item). Floors and ceilings are corrected as in SDT, but without printing
+    a warning for each element. Elements with no trials are NaN.
+    """
+
+    hits, misses, fas, crs = (np.asarray(x, dtype=float) for x in (hits, misses, fas, crs))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+
+        # Floors and ceilings are replaced by half hits and half FA's
+        half_hit = 0.5 / (hits + misses)
+        half_fa = 0.5 / (fas + crs)
+        hit_rate = hits / (hits + misses)
+        hit_rate = np.where(hit_rate == 1, 1 - half_hit, hit_rate)
+        hit_rate = np.where(hit_rate == 0, half_hit, hit_rate)
+        fa_rate = fas / (fas + crs)
+        fa_rate = np.where(fa_rate == 1, 1 - half_fa, fa_rate)
+        fa_rate = np.where(fa_rate == 0, half_fa, fa_rate)
+
+        #Calculate parametric measures: d', beta, c and Az
+        out = {}
+        out['dprime'] = sps.norm.ppf(hit_rate) - sps.norm.ppf(fa_rate)
+        out['Az']     = sps.norm.cdf(out['dprime'] / np.sqrt(2))
+        out['beta']   = np.exp((sps.norm.ppf(fa_rate)**2 - sps.norm.ppf(hit_rate)**2) / 2)
+        out['c']      = -(sps.norm.ppf(hit_rate) + sps.norm.ppf(fa_rate)) / 2
+
+        #Calculate non-parametric measures
+        out['A'] = (0.5 + np.sign(hit_rate - fa_rate) *
+                    ( ((hit_rate - fa_rate)**2 + np.abs(hit_rate - fa_rate)) /
+                      (4 * np.maximum(hit_rate, fa_rate) - 4 * hit_rate * fa_rate)))
+        out['B'] = (np.sign(hit_rate - fa_rate) *
+                    ( (hit_rate*(1-hit_rate) - fa_rate*(1-fa_rate)) /
+                      (hit_rate*(1-hit_rate) + fa_rate*(1-fa_rate))))
+
+    return out
+
+
+def import_ret_data(main_dir=None):
+    """
+    Import all immediate (ret1) and delayed (ret2) retrieval files into a
+    single data frame with sub_id and delay columns
+    """
+
+    if main_dir is None:
+        main_dir = os.getcwd()
+
+    behav_dir = join(main_dir, 'psychopy')
+
+    ret_dfs = []
+    for file in sorted(os.listdir(behav_dir)):
+        if not (file[:2].isdigit() and file.endswith('.csv')):
+            continue
+        if file[8:13] == '_ret1':
+            delay = 'I'
+        elif file[8:13] == '_ret2':
+            delay = 'D'
+        else:
+            continue
+        ret_data = pd.read_csv(join(behav_dir, file))
+        #Remove dots in column names
+        ret_data.columns = [x.replace('.', '_') for x in ret_data.columns]
+        #Make R/K response column numeric
+        ret_data['rk_resp_keys'] = ret_data['rk_resp_keys'].replace({'None':np.nan}).astype(float)
+        ret_data['sub_id'] = file[:8]
+        ret_data['delay'] = delay
+        ret_dfs.append(ret_data[['sub_id', 'delay', 'stim_word', 'valence', 'mem_cond',
+                                 'oldnew_resp_keys', 'rk_resp_keys']])
+
+    ret_data = pd.concat(ret_dfs, ignore_index=True)
+
+    #Only memory test trials
+    ret_data = ret_data[ret_data['valence'].isin(['NEU', 'NEG', 'animal']) &
+                        ret_data['mem_cond'].isin(['Old', 'New'])]
+
+    return ret_data.rename({'stim_word':'word'}, axis=1)
+
+
+def make_item_mem_matrix(ret_data):
+    """
+    Create a word x subject matrix of integer coded memory outcomes (see
+    ITEM_CODES) for each delay. Matrices are sparse with 0 indicating that
+    the word was not tested for that subject (or there was no response).
+
+    Returns (words, sub_ids, mem_mats) where mem_mats is a dictionary of
+    scipy.sparse.csr_matrix objects with keys 'I' and 'D'.
+    """
+
+    #Integer index for each word and subject (the same across delays)
+    words, word_idx = np.unique(ret_data['word'].values.astype(str), return_inverse=True)
+    sub_ids, sub_idx = np.unique(ret_data['sub_id'].values.astype(str), return_inverse=True)
+
+    #Code outcome of each trial
+    old = (ret_data['mem_cond'] == 'Old').values
+    old_resp = (ret_data['oldnew_resp_keys'] == 5).values
+    new_resp = (ret_data['oldnew_resp_keys'] == 4).values
+    K_resp = (ret_data['rk_resp_keys'] == 4).values
+    R_resp = (ret_data['rk_resp_keys'] == 5).values
+    codes = np.zeros(len(ret_data), dtype=np.int8)
+    codes[old & new_resp] = ITEM_CODES['Old_miss']
+    codes[old & old_resp & K_resp] = ITEM_CODES['Old_K']
+    codes[old & old_resp & R_resp] = ITEM_CODES['Old_R']
+    codes[~old & new_resp] = ITEM_CODES['New_CR']
+    codes[~old & old_resp & K_resp] = ITEM_CODES['New_K']
+    codes[~old & old_resp & R_resp] = ITEM_CODES['New_R']
+
+    mem_mats = {}
+    for dly in ['I', 'D']:
+        idx = (ret_data['delay'] == dly).values & (codes > 0)
+        assert not ret_data[idx].duplicated(['sub_id', 'word']).any()
+        mem_mats[dly] = sparse.csr_matrix((codes[idx], (word_idx[idx], sub_idx[idx])),
+                                          shape=(len(words), len(sub_ids)), dtype=np.int8)
+
+    return (words, sub_ids, mem_mats)
+
+
+def item_mem_stats(words, mem_mats):
+    """
+    Calculate item-level memory rates and signal detection measures from the
+    word x subject matrices created by make_item_mem_matrix. Returns a wide
+    format data frame with one row per word and columns named by delay
+    (e.g., HitRate_immediate) to match the word averaged ERP data.
+    """
+
+    item_data = pd.DataFrame({'word': words})
+    n_codes = max(ITEM_CODES.values()) + 1
+
+    for dly, delay in [('I', 'immediate'), ('D', 'delayed')]:
+
+        #Count each outcome for each word in a single pass over non-zero elements
+        mat = mem_mats[dly]
+        rows = np.repeat(np.arange(mat.shape[0]), np.diff(mat.indptr))
+        counts = np.bincount(rows * n_codes + mat.data,
+                             minlength=mat.shape[0]*n_codes).reshape(mat.shape[0], n_codes)
+        (misses, K_hits, R_hits, CR, K_FA, R_FA) = (counts[:, ITEM_CODES[x]] for x in
+                                                    ['Old_miss', 'Old_K', 'Old_R', 'New_CR', 'New_K', 'New_R'])
+        hits = K_hits + R_hits
+        FA = K_FA + R_FA
+        old_N = hits + misses
+        new_N = FA + CR
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+
+            #Trial numbers
+            item_data['Old_N_' + delay] = old_N
+            item_data['New_N_' + delay] = new_N
+
+            #Memory rates
+            item_data['HitRate_' + delay] = hits / old_N
+            item_data['FARate_' + delay] = FA / new_N
+
+            #Signal detection measures
+            SD_meas = SDT_array(hits, misses, FA, CR)
+            item_data['dprime_' + delay] = SD_meas['dprime']
+            item_data['Az_' + delay] = SD_meas['Az']
+            item_data['criterion_' + delay] = SD_meas['c']
+            item_data['A_' + delay] = SD_meas['A']
+            item_data['B_' + delay] = SD_meas['B']
+
+            #RK measures
+            item_data['K_HitRate_' + delay] = K_hits / old_N
+            item_data['R_HitRate_' + delay] = R_hits / old_N
+            item_data['K_FARate_' + delay] = K_FA / new_N
+            item_data['R_FARate_' + delay] = R_FA / new_N
+
+            #R vs. Not R signal detection measures
+            R_SD_meas = SDT_array(R_hits, K_hits + misses, R_FA, CR + K_FA)
+            item_data['R_dprime_' + delay] = R_SD_meas['dprime']
+            item_data['R_Az_' + delay] = R_SD_meas['Az']
+            item_data['R_criterion_' + delay] = R_SD_meas['c']
+            item_data['R_A_' + delay] = R_SD_meas['A']
+            item_data['R_B_' + delay] = R_SD_meas['B']
+
+    return item_data
+
+
+def process_items(main_dir=None, save_file=True):
+    """
+    Calculate item-level memory statistics across all subjects
+    """
+
+    if main_dir is None:
+        main_dir = os.getcwd()
+
+    ret_data = import_ret_data(main_dir)
+    (words, sub_ids, mem_mats) = make_item_mem_matrix(ret_data)
+    item_data = item_mem_stats(words, mem_mats)
+
+    if save_file:
+        atomic_to_csv(item_data, join(main_dir, 'stats', 'behavioral', 'EmCon_ItemMemory_wide.csv'),
+                      index=False)
+
+    return (item_data, words, sub_ids, mem_mats)
+
+
+def update_sub(sub_id, main_dir=None):
+    """
+    Process a single subject and update only that subject's rows in the wide
+    and long summary files
+    """
     
-    main_dir = r'C:\Users\fieldsec\OneDrive - Westminster College\Documents\ECF\Research\EmCon\DATA'
+    if main_dir is None:
+        main_dir = os.getcwd()
     
-    sub_id = input('Sub ID: ')
+    #Update wide format files
+    (behav_data, mem_data) = process_sub(sub_id, main_dir)
+    
+    #Replace subject's rows in long format file
+    long_file = join(main_dir, 'stats', 'behavioral', 'EmCon_memory_long.csv')
+    sub_long = wide2long(mem_data.loc[[sub_id]])
+    if os.path.exists(long_file):
+        mem_data_long = pd.read_csv(long_file)
+        mem_data_long = mem_data_long[mem_data_long['sub_id'] != sub_id]
+        mem_data_long = pd.concat((mem_data_long, sub_long), ignore_index=True)
+        mem_data_long = mem_data_long.sort_values('sub_id', kind='stable')
+    else:
+        mem_data_long = sub_long
+    atomic_to_csv(mem_data_long, long_file, index=False)
+    
+    return (behav_data, mem_data, mem_data_long)
+
+
+def get_sub_files(main_dir=None):
+    """
+    Return a dictionary mapping each subject ID to a sorted tuple of 
+    (file, size, modification time) for its PsychoPy csv files
+    """
+    
+    if main_dir is None:
+        main_dir = os.getcwd()
+    
+    behav_dir = join(main_dir, 'psychopy')
+    
+    sub_files = {}
+    for file in os.listdir(behav_dir):
+        if not (file[:2].isdigit() and file.endswith('.csv')):
+            continue
+        try:
+            stat = os.stat(join(behav_dir, file))
+        except FileNotFoundError:
+            continue
+        sub_files.setdefault(file[:8], []).append((file, stat.st_size, stat.st_mtime))
+    
+    return {sub_id: tuple(sorted(files)) for (sub_id, files) in sub_files.items()}
+
+
+def watch(main_dir=None, poll_interval=5, settle_time=15, process_existing=False):
+    """
+    Monitor the psychopy directory and update the summary files for a subject
+    whenever their encoding and retrieval files are added or changed. Files 
+    must be unchanged for settle_time seconds before they are processed so 
+    that partially written files are ignored. Stop with Ctrl+C.
+    """
+    
+    if main_dir is None:
+        main_dir = os.getcwd()
+    
+    #Files that have already been processed
+    if process_existing:
+        done = {}
+    else:
+        done = get_sub_files(main_dir)
+    
+    #Changed files waiting to settle: sub_id -> (files, time last changed)
+    pending = {}
+    
+    print('Watching %s' % join(main_dir, 'psychopy'))
+    
+    try:
+        while True:
+            
+            now = time.time()
+            
+            for (sub_id, files) in get_sub_files(main_dir).items():
+                
+                if files == done.get(sub_id):
+                    pending.pop(sub_id, None)
+                    continue
+                
+                #Restart the clock whenever files are still changing
+                if sub_id not in pending or pending[sub_id][0] != files:
+                    pending[sub_id] = (files, now)
+                    continue
+                if now - pending[sub_id][1] < settle_time:
+                    continue
+                
+                #Only process once the encoding and immediate retrieval are present
+                del pending[sub_id]
+                done[sub_id] = files
+                if not (any(file[0].startswith('%s_enc' % sub_id) for file in files) and
+                        any(file[0].startswith('%s_ret1' % sub_id) for file in files)):
+                    continue
+                
+                print('Processing %s' % sub_id)
+                try:
+                    update_sub(sub_id, main_dir)
+                except Exception as e:
+                    print('WARNING: Processing %s failed: %s' % (sub_id, e))
+            
+            time.sleep(poll_interval)
+    
+    except KeyboardInterrupt:
+        print('Stopped watching')
+
 
-    if sub_id == 'all':
+def run(sub_id, main_dir=None):
+    """
+    Process a single subject, 'all' subjects, or 'watch' for new data
+    """
+    
+    if main_dir is None:
+        main_dir = os.getcwd()
+
+    if sub_id == 'watch':
+        watch(main_dir)
+        return
+    elif sub_id == 'all':
         (behav_data, mem_data) = process_all(main_dir)
+        #Item-level memory data across all subjects
+        process_items(main_dir)
     else:
         (behav_data, mem_data) = process_sub(sub_id, main_dir)
         
     #Create and save wide format memory data
     mem_data_long = wide2long(mem_data)
-    mem_data_long.to_csv(join(main_dir, 'stats', 'behavioral', 'EmCon_memory_long.csv'),
-                         index=False)
+    atomic_to_csv(mem_data_long, join(main_dir, 'stats', 'behavioral', 'EmCon_memory_long.csv'),
+                  index=False)
+
+
+def main(main_dir=None):
+    
+    if main_dir is None:
+        main_dir = os.environ.get('EMCON_DIR', 
+                                  r'C:\Users\fieldsec\OneDrive - Westminster College\Documents\ECF\Research\EmCon\DATA')
+    
+    sub_id = input('Sub ID: ')
+    run(sub_id, main_dir)
 
 
 if __name__ == '__main__':
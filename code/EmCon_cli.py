@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+Command line interface for EmCon data processing
+
+The data directory is given by --main_dir or the EMCON_DIR environment
+variable (default: the current working directory). Heavy libraries (pandas,
+scipy, matplotlib, etc.) are only imported by the subcommands that use them.
+
+EXAMPLE USAGE
+python EmCon_cli.py --main_dir /data/EmCon behav all
+python EmCon_cli.py behav 34_EmCon 35_EmCon
+python EmCon_cli.py behav watch
+python EmCon_cli.py compile
+python EmCon_cli.py waveforms --n_jobs 8
+python EmCon_cli.py graphs --no_show
+python EmCon_cli.py fix
+python EmCon_cli.py ica-summary
+python EmCon_cli.py status
+
+Author: Eric Fields
+Version Date: 19 October 2026
+
+Copyright (c) 2026, Eric Fields
+All rights reserved.
+This code is free and open source software made available under the terms of the 3-clause BSD license:
+https://opensource.org/licenses/BSD-3-Clause
+"""
+
+import os
+from os.path import join
+import sys
+import argparse
+import csv
+
+
+#Location of the code and stats folders in this repository
+code_dir = os.path.dirname(os.path.abspath(__file__))
+repo_dir = os.path.dirname(code_dir)
+
+
+def _import_from(directory, module):
+    """
+    Import a module from a folder in this repository
+    """
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+    return __import__(module)
+
+
+def get_sub_ids(main_dir):
+    """
+    Get all subject IDs with PsychoPy data
+    """
+    behav_dir = join(main_dir, 'psychopy')
+    return sorted(set(file[:8] for file in os.listdir(behav_dir)
+                      if file.endswith('.csv') and file[:2].isdigit()))
+
+
+def behav(args):
+    EmCon_behav = _import_from(code_dir, 'EmCon_behav')
+    if args.sub_ids == ['watch']:
+        EmCon_behav.watch(args.main_dir, poll_interval=args.poll_interval,
+                          settle_time=args.settle_time)
+    else:
+        for sub_id in args.sub_ids:
+            EmCon_behav.run(sub_id, args.main_dir)
+
+
+def compile_averaged(args):
+    EmCon_compile_averaged = _import_from(join(repo_dir, 'stats', 'erp', 'avg'),
+                                          'EmCon_compile_averaged')
+    EmCon_compile_averaged.main(args.main_dir)
+
+
+def waveforms(args):
+    EmCon_waveforms = _import_from(join(repo_dir, 'stats', 'erp', 'avg'), 'EmCon_waveforms')
+    EmCon_waveforms.main(args.main_dir, n_jobs=args.n_jobs)
+
+
+def graphs(args):
+    if args.no_show:
+        #Non-interactive backend for running without a display
+        import matplotlib
+        matplotlib.use('Agg')
+    EmCon_make_behavioral_graphs = _import_from(join(repo_dir, 'stats', 'behavioral'),
+                                                'EmCon_make_behavioral_graphs')
+    EmCon_make_behavioral_graphs.make_graphs(args.main_dir, show=not args.no_show)
+
+
+def fix(args):
+    EmCon_fix_files = _import_from(code_dir, 'EmCon_fix_files')
+    EmCon_fix_files.fix_files(args.main_dir)
+
+
+def ica_summary(args):
+    """
+    Summarize pre-ICA rejection and ICA results for each subject
+    """
+
+    ica_dir = join(args.main_dir, 'ICA')
+
+    sub_ids = sorted(file[:-len('_bad_epochs.csv')] for file in os.listdir(ica_dir)
+                     if file.endswith('_bad_epochs.csv'))
+
+    rows = []
+    for sub_id in sub_ids:
+
+        row = {'sub_id': sub_id}
+
+        #Epochs excluded from ICA training
+        with open(join(ica_dir, sub_id + '_bad_epochs.csv')) as f:
+            bad_epochs = [float(x) for x in f.read().split()]
+        row['N_epochs'] = len(bad_epochs)
+        row['N_bad_epochs'] = int(sum(bad_epochs))
+
+        #Channels excluded from ICA
+        exc_file = join(ica_dir, sub_id + '_exclude_chans.csv')
+        if os.path.isfile(exc_file):
+            with open(exc_file) as f:
+                exc_chans = [x for x in f.read().replace(',', ' ').split() if float(x)]
+            row['exclude_chans'] = ' '.join(exc_chans)
+        else:
+            row['exclude_chans'] = ''
+
+        #ICA weights
+        w_file = join(ica_dir, sub_id + '_ICAw.txt')
+        if os.path.isfile(w_file):
+            with open(w_file) as f:
+                row['N_components'] = sum(1 for line in f if line.strip())
+        else:
+            row['N_components'] = ''
+
+        #Number of training steps and final weight change from log
+        row['N_steps'] = ''
+        row['final_wchange'] = ''
+        log_file = join(ica_dir, sub_id + '_ICA_log.txt')
+        if os.path.isfile(log_file):
+            with open(log_file) as f:
+                for line in f:
+                    if line.startswith('step '):
+                        fields = line.replace(',', '').split()
+                        row['N_steps'] = int(fields[1])
+                        row['final_wchange'] = fields[fields.index('wchange') + 1]
+
+        rows.append(row)
+
+    fieldnames = ['sub_id', 'N_epochs', 'N_bad_epochs', 'exclude_chans',
+                  'N_components', 'N_steps', 'final_wchange']
+    if args.out_file:
+        with open(args.out_file, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        print('\t'.join(fieldnames))
+        for row in rows:
+            print('\t'.join(str(row[x]) for x in fieldnames))
+
+
+def status(args):
+    """
+    List the PsychoPy and ICA files present for each subject
+    """
+
+    behav_files = os.listdir(join(args.main_dir, 'psychopy'))
+    ica_dir = join(args.main_dir, 'ICA')
+    ica_files = os.listdir(ica_dir) if os.path.isdir(ica_dir) else []
+
+    print('sub_id\tenc\tret1\tret2\tICA')
+    for sub_id in get_sub_ids(args.main_dir):
+        present = [any(file.startswith('%s_%s' % (sub_id, task)) and file.endswith('.csv')
+                       for file in behav_files)
+                   for task in ['enc', 'ret1', 'ret2']]
+        present.append(sub_id + '_ICAw.txt' in ica_files)
+        print('\t'.join([sub_id] + ['x' if x else '-' for x in present]))
+
+
+def parse_args(argv=None):
+
+    parser = argparse.ArgumentParser(description='EmCon data processing')
+    parser.add_argument('--main_dir', default=os.environ.get('EMCON_DIR', os.getcwd()),
+                        help='data directory (default: EMCON_DIR environment variable or current directory)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    p = subparsers.add_parser('behav', help='process behavioral and memory data')
+    p.add_argument('sub_ids', nargs='+',
+                   help="subject IDs to process, 'all' to process all subjects, or 'watch' to process new data as it is recorded")
+    p.add_argument('--poll_interval', type=float, default=5,
+                   help='seconds between checks for new files in watch mode')
+    p.add_argument('--settle_time', type=float, default=15,
+                   help='seconds files must be unchanged before processing in watch mode')
+    p.set_defaults(func=behav)
+
+    p = subparsers.add_parser('compile', help='create word and subject averaged ERP data')
+    p.set_defaults(func=compile_averaged)
+
+    p = subparsers.add_parser('waveforms', help='create word and subject averaged ERP waveforms')
+    p.add_argument('--n_jobs', type=int, default=None,
+                   help='number of subjects to process in parallel (default: number of CPUs)')
+    p.set_defaults(func=waveforms)
+
+    p = subparsers.add_parser('graphs', help='make behavioral memory graphs')
+    p.add_argument('--no_show', action='store_true',
+                   help='save graphs without displaying them')
+    p.set_defaults(func=graphs)
+
+    p = subparsers.add_parser('fix', help='fix problems in PsychoPy files')
+    p.set_defaults(func=fix)
+
+    p = subparsers.add_parser('ica-summary', help='summarize ICA rejection and results')
+    p.add_argument('--out_file', help='save summary to this csv file instead of printing')
+    p.set_defaults(func=ica_summary)
+
+    p = subparsers.add_parser('status', help='list data files present for each subject')
+    p.set_defaults(func=status)
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,7 @@ Author:Eric Fields
 Version Date: 22 April 2025
 """
 
+import os
 from os.path import join
 import numpy as np
 import pandas as pd
@@ -13,71 +14,95 @@ import scipy.stats as sps
 import matplotlib.pyplot as plt
 import seaborn as sns
 
-main_dir = r'C:\Users\fieldsec\OneDrive - Westminster College\Documents\ECF\Research\EmCon\DATA'
 
+def import_data(main_dir):
+    """
+    Import long format memory data for the participants used in analyses
+    """
+    
+    sdata = pd.read_csv(join(main_dir, 'stats', 'behavioral', 'EmCon_memory_long.csv'))
+    sdata = sdata[sdata['valence'] != 'animal']
+    sdata['delay'] = sdata['delay'].replace({'I':'immediate', 'D':'delayed'})
 
-#%% IMPORT DATA
+    #drop unused participants
+    drop_subs = ['01_EmCon', '07_EmCon', '18_EmCon']
+    sdata = sdata[~sdata['sub_id'].isin(drop_subs)]
+    assert len(sdata['sub_id'].unique()) == 30
+    
+    return sdata
 
-sdata = pd.read_csv(join(main_dir, 'stats', 'behavioral', 'EmCon_memory_long.csv'))
-sdata = sdata[sdata['valence'] != 'animal']
-sdata['delay'] = sdata['delay'].replace({'I':'immediate', 'D':'delayed'})
 
-#drop unused participants
-drop_subs = ['01_EmCon', '07_EmCon', '18_EmCon']
-sdata = sdata[~sdata['sub_id'].isin(drop_subs)]
-assert len(sdata['sub_id'].unique()) == 30
+def make_graphs(main_dir, show=True):
+    """
+    Make box plots of memory results and save to stats/behavioral/plots.
+    Set show=False to save the plots without displaying them (e.g., when
+    running without a display).
+    """
+    
+    sdata = import_data(main_dir)
+    
+    DVs = {'HitRate': 'hit rate', 'FARate': 'false alarm rate', 
+           'dprime':"d' (discriminability)", 'criterion':'c (response bias)'}
 
+    for DV in DVs:
 
-#%% MAKE BAR GRAPHS
+        #Check assumptions
+        print('####### %s #######' % DV)
+        print('SKEW')
+        print(sdata[['delay', 'valence', DV]].groupby(['delay', 'valence']).skew())
+        print('KURTOSIS')
+        print(sdata[['delay', 'valence', DV]].groupby(['delay', 'valence']).aggregate(sps.kurtosis))
 
-DVs = {'HitRate': 'hit rate', 'FARate': 'false alarm rate', 
-       'dprime':"d' (discriminability)", 'criterion':'c (response bias)'}
+        plt.figure()
 
-for DV in DVs:
-    
-    #Check assumptions
-    print('####### %s #######' % DV)
-    print('SKEW')
-    print(sdata[['delay', 'valence', DV]].groupby(['delay', 'valence']).skew())
-    print('KURTOSIS')
-    print(sdata[['delay', 'valence', DV]].groupby(['delay', 'valence']).aggregate(sps.kurtosis))
-    
-    plt.figure()
-
-    # fig = sns.barplot(x='delay', y=DV, hue='valence', 
-    #                   estimator=np.mean,
-    #                   errorbar='se',
-    #                   order=['immediate', 'delayed'], hue_order=['NEU', 'NEG'],
-    #                   palette=['dimgray', 'firebrick'],
-    #                   data = sdata)
-    
-    fig = sns.boxplot(data=sdata, x='delay', y=DV, hue='valence',
-                       palette=['dimgray', 'firebrick'],
-                       whis=(5, 95), fliersize=0, showmeans=True,
-                       meanprops={'marker': 's',
-                                  'markerfacecolor':'lime',
-                                  'markeredgecolor':'lime',
-                                  'markersize':'6'})
-    
-    sns.stripplot(x='delay', y=DV, hue='valence',
-                  order=['immediate', 'delayed'], hue_order=['NEU', 'NEG'],
-                  palette=['dimgray', 'firebrick'],
-                  edgecolor='gray', linewidth=1,
-                  data=sdata, dodge=True, alpha=0.6, ax=fig)
-    
-    fig.legend_.remove()
-    plt.xlabel('')
-    plt.ylabel(DVs[DV])
-    plt.rcParams.update({'font.size': 18})
-    if DV in ['HitRate', 'FARate']:
-        plt.yticks(np.arange(0, 1.01, 0.2))
-    elif DV == 'dprime':
-        plt.yticks(np.arange(-0.5, 3.01, 0.5))
-    else:
-        plt.yticks(np.arange(-1, 2.01, 0.5))
-        
-    plt.show()
+        # fig = sns.barplot(x='delay', y=DV, hue='valence', 
+        #                   estimator=np.mean,
+        #                   errorbar='se',
+        #                   order=['immediate', 'delayed'], hue_order=['NEU', 'NEG'],
+        #                   palette=['dimgray', 'firebrick'],
+        #                   data = sdata)
+
+        fig = sns.boxplot(data=sdata, x='delay', y=DV, hue='valence',
+                           palette=['dimgray', 'firebrick'],
+                           whis=(5, 95), fliersize=0, showmeans=True,
+                           meanprops={'marker': 's',
+                                      'markerfacecolor':'lime',
+                                      'markeredgecolor':'lime',
+                                      'markersize':'6'})
+
+        sns.stripplot(x='delay', y=DV, hue='valence',
+                      order=['immediate', 'delayed'], hue_order=['NEU', 'NEG'],
+                      palette=['dimgray', 'firebrick'],
+                      edgecolor='gray', linewidth=1,
+                      data=sdata, dodge=True, alpha=0.6, ax=fig)
+
+        fig.legend_.remove()
+        plt.xlabel('')
+        plt.ylabel(DVs[DV])
+        plt.rcParams.update({'font.size': 18})
+        if DV in ['HitRate', 'FARate']:
+            plt.yticks(np.arange(0, 1.01, 0.2))
+        elif DV == 'dprime':
+            plt.yticks(np.arange(-0.5, 3.01, 0.5))
+        else:
+            plt.yticks(np.arange(-1, 2.01, 0.5))
+
+        if show:
+            plt.show()
+
+        plt.savefig(join(main_dir, 'stats', 'behavioral', 'plots', '%s.tif' % DV), dpi=1000, bbox_inches='tight')
+
+        plt.close()
+
+
+def main(main_dir=None):
     
-    plt.savefig(join(main_dir, 'stats', 'behavioral', 'plots', '%s.tif' % DV), dpi=1000, bbox_inches='tight')
+    if main_dir is None:
+        main_dir = os.environ.get('EMCON_DIR', 
+                                  r'C:\Users\fieldsec\OneDrive - Westminster College\Documents\ECF\Research\EmCon\DATA')
     
-    plt.close()
+    make_graphs(main_dir)
+
+
+if __name__ == '__main__':
+    main()
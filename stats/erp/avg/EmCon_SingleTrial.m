@@ -9,6 +9,10 @@ clearvars; close all;
 
 main_dir = 'C:\Users\fieldsec\OneDrive - Westminster College\Documents\ECF\Research\EmCon\DATA';
 st_dir = fullfile(main_dir, 'stats', 'erp', 'avg');
+wave_dir = fullfile(main_dir, 'EEGsets', 'single_trial');
+if ~exist(wave_dir, 'dir')
+    mkdir(wave_dir);
+end
 
 addpath(fullfile(main_dir, 'code'));
 
@@ -81,6 +85,16 @@ for s = 1:length(subs)
         %fprintf('Epoch %d:\t%d\t%d\n', ep, behav_data{ep, 'word_ec'}, str2double(EEG.epoch(ep).eventtype(end-3:end-1)));
     end
     
+    %Save single trial waveforms for EmCon_waveforms.py as float32 
+    %trials x channels x time points (C order)
+    fid = fopen(fullfile(wave_dir, [subs{s} '_epochs.dat']), 'w', 'ieee-le');
+    fwrite(fid, permute(EEG.data, [2, 1, 3]), 'float32');
+    fclose(fid);
+    if s == 1
+        writecell({EEG.chanlocs.labels}', fullfile(wave_dir, 'EmCon_chans.csv'));
+        writematrix(EEG.times', fullfile(wave_dir, 'EmCon_times.csv'));
+    end
+    
     %Get channel and time point indices for ROIs
     p_chan_idx = find(ismember({EEG.chanlocs.labels}, p_chans));
     [~, p_start_sample] = min(abs( EEG.times - p_time_wind(1) ));
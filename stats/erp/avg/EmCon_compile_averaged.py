@@ -7,6 +7,7 @@ Author: Eric Fields
 Version Date: 1 April 2024
 """
 
+import os
 from os.path import join
 import numpy as np
 import pandas as pd
@@ -139,9 +140,11 @@ def make_sub_averaged(st_data, out_dir=None):
     return (sdata, sdata_wide)
 
 
-def main():
+def main(main_dir=None):
 
-    main_dir = r'C:\Users\fieldsec\OneDrive - Westminster College\Documents\ECF\Research\EmCon\DATA'
+    if main_dir is None:
+        main_dir = os.environ.get('EMCON_DIR', 
+                                  r'C:\Users\fieldsec\OneDrive - Westminster College\Documents\ECF\Research\EmCon\DATA')
     out_dir = join(main_dir, 'stats', 'erp', 'avg', 'data')
     
     #Add response bias to single trial data
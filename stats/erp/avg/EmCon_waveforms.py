@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+Create word and subject averaged ERP waveforms from single trial epochs.
+
+Single trial epochs are saved by EmCon_SingleTrial.m in EEGsets/single_trial
+as one float32 file per subject (trials x channels x time points) along with
+the channel labels and epoch time points. Trial information comes from
+EmCon_SingleTrial.csv (the order column gives the epoch number). Epochs are
+memory-mapped and read in chunks of trials, so each subject's data is never
+loaded all at once. Word and subject averages are computed in a single pass
+over each subject's epochs, with a limited number of subjects processed in
+parallel. Memory use depends on the number of groups and parallel jobs 
+rather than the number of trials.
+
+Author: Eric Fields
+Version Date: 19 October 2026
+"""
+
+import os
+from os.path import join
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+import pandas as pd
+
+
+def load_info(wave_dir):
+    """
+    Return channel labels and time points (ms) for saved epochs
+    """
+    chans = pd.read_csv(join(wave_dir, 'EmCon_chans.csv'), header=None)[0].tolist()
+    times = pd.read_csv(join(wave_dir, 'EmCon_times.csv'), header=None)[0].values
+    return (chans, times)
+
+
+def load_sub_epochs(wave_dir, sub_id, n_chans, n_times):
+    """
+    Return a read-only memory map of a subject's epochs with dimensions
+    trials x channels x time points
+    """
+    epoch_file = join(wave_dir, '%s_epochs.dat' % sub_id)
+    n_values = os.path.getsize(epoch_file) // 4
+    if n_values % (n_chans * n_times):
+        raise RuntimeError('%s does not match %d channels and %d time points'
+                           % (epoch_file, n_chans, n_times))
+    return np.memmap(epoch_file, dtype='<f4', mode='r',
+                     shape=(n_values // (n_chans * n_times), n_chans, n_times))
+
+
+def _sum_sub_epochs(wave_dir, sub_id, n_chans, n_times, group_idx, chunk_size):
+    """
+    Sum a subject's epochs within groups for one or more groupings, reading 
+    chunk_size trials at a time. group_idx is a list with an array for each 
+    grouping giving the group for each epoch (-1 for excluded epochs). Returns
+    a list with the groups present and the summed epochs for those groups for
+    each grouping.
+    """
+
+    epochs = load_sub_epochs(wave_dir, sub_id, n_chans, n_times)
+    assert all(epochs.shape[0] == len(g) for g in group_idx)
+
+    groups = [np.unique(g[g >= 0]) for g in group_idx]
+    sums = [np.zeros((len(g), n_chans * n_times)) for g in groups]
+
+    for start in range(0, epochs.shape[0], chunk_size):
+        chunk_groups = [g[start:start+chunk_size] for g in group_idx]
+        use = np.flatnonzero(np.any([g >= 0 for g in chunk_groups], axis=0))
+        if not len(use):
+            continue
+        chunk = np.asarray(epochs[start+use], dtype=np.float64).reshape(len(use), -1)
+        for (i, g) in enumerate(chunk_groups):
+            #Add each trial to its group by multiplying with an indicator matrix
+            trials = np.flatnonzero(g[use] >= 0)
+            rows = np.searchsorted(groups[i], g[use[trials]])
+            indicator = np.zeros((len(groups[i]), len(use)))
+            indicator[rows, trials] = 1
+            sums[i] += indicator @ chunk
+
+    return [(g, x.reshape(len(g), n_chans, n_times)) for (g, x) in zip(groups, sums)]
+
+
+def average_waveforms(st_data, wave_dir, groupings, n_jobs=None, chunk_size=100):
+    """
+    Average single trial epochs within groups for each grouping (a list of 
+    lists of column names) using only trials with a correct response that were 
+    not rejected. Each subject's epochs are read once for all groupings, and 
+    up to n_jobs subjects are processed in parallel.
+    
+    Returns a list with, for each grouping, a data frame with one row per 
+    group (with the number of trials) and an array of averaged waveforms with
+    dimensions groups x channels x time points.
+    """
+
+    (chans, times) = load_info(wave_dir)
+    if n_jobs is None:
+        n_jobs = os.cpu_count()
+
+    #Only use trials with a correct response that were not rejected
+    idx = (st_data['art_rej'] == 0) & (st_data['acc'] == 1)
+
+    #Number each group and find the group for each trial
+    trial_nums = []
+    group_idx = []
+    for group_cols in groupings:
+        trial_nums.append(st_data[idx].groupby(group_cols).size())
+        g = pd.Series(-1, index=st_data.index)
+        g[idx] = trial_nums[-1].index.get_indexer(pd.MultiIndex.from_frame(st_data.loc[idx, group_cols]))
+        group_idx.append(g)
+
+    sums = [np.zeros((len(n), len(chans), len(times))) for n in trial_nums]
+
+    def add_results(futures):
+        for future in futures:
+            for (i, (groups, sub_sums)) in enumerate(future.result()):
+                sums[i][groups] += sub_sums
+
+    #Keep at most n_jobs subjects in progress so that memory use does not
+    #grow with the number of subjects
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        pending = set()
+        for sub in st_data['sub_id'].unique():
+            if len(pending) >= n_jobs:
+                (done, pending) = wait(pending, return_when=FIRST_COMPLETED)
+                add_results(done)
+            sub_order = st_data.loc[st_data['sub_id']==sub, 'order'].sort_values()
+            assert (sub_order.values == np.arange(1, len(sub_order)+1)).all()
+            pending.add(executor.submit(_sum_sub_epochs, wave_dir, sub, len(chans), len(times),
+                                        [g[sub_order.index].values for g in group_idx], chunk_size))
+        while pending:
+            (done, pending) = wait(pending, return_when=FIRST_COMPLETED)
+            add_results(done)
+
+    return [(n.reset_index(name='N_trials'), 
+             (x / n.values[:, np.newaxis, np.newaxis]).astype(np.float32))
+            for (n, x) in zip(trial_nums, sums)]
+
+
+def make_averaged_waveforms(st_data, wave_dir, out_dir=None, n_jobs=None):
+    """
+    Average waveforms by word and delay and by subject, valence, and delay
+    """
+
+    ((wdata, wavg), (sdata, savg)) = average_waveforms(st_data, wave_dir, 
+                                                       [['word', 'valence', 'delay'],
+                                                        ['sub_id', 'valence', 'delay']],
+                                                       n_jobs=n_jobs)
+
+    if out_dir is not None:
+        wdata.to_csv(join(out_dir, 'EmCon_WordAveraged_waveforms.csv'), index=False)
+        np.save(join(out_dir, 'EmCon_WordAveraged_waveforms.npy'), wavg)
+        sdata.to_csv(join(out_dir, 'EmCon_SubAveraged_waveforms.csv'), index=False)
+        np.save(join(out_dir, 'EmCon_SubAveraged_waveforms.npy'), savg)
+
+    return ((wdata, wavg), (sdata, savg))
+
+
+def main(main_dir=None, n_jobs=None):
+
+    if main_dir is None:
+        main_dir = os.environ.get('EMCON_DIR',
+                                  r'C:\Users\fieldsec\OneDrive - Westminster College\Documents\ECF\Research\EmCon\DATA')
+    wave_dir = join(main_dir, 'EEGsets', 'single_trial')
+    out_dir = join(main_dir, 'stats', 'erp', 'avg', 'data')
+
+    st_data = pd.read_csv(join(out_dir, 'EmCon_SingleTrial.csv'))
+
+    #Get word averaged and subject averaged waveforms
+    make_averaged_waveforms(st_data, wave_dir, out_dir=out_dir, n_jobs=n_jobs)
+
+
+if __name__ == '__main__':
+    main()